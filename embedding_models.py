@@ -0,0 +1,215 @@
+"""Modelos de embedding do agente: ONNX INT8 com fallback para HuggingFace.
+
+Módulo sem dependência de main.py, para que o processo worker de embeddings
+(embedding_worker) carregue o modelo sem reexecutar a inicialização do agente.
+"""
+
+import asyncio
+import logging
+import os
+import shutil
+import tempfile
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+logger = logging.getLogger(__name__)
+
+# Diretório onde os modelos ONNX quantizados ficam salvos entre execuções
+CACHE_EMBEDDINGS = os.path.join(os.path.expanduser("~"), ".cache", "agent", "embeddings")
+# Exportações interrompidas (processo morto) deixam diretórios .tmp-* para trás
+_IDADE_MAX_TEMPORARIO = 24 * 3600
+# Textos por chamada ao modelo: uma GEMM grande em vez de várias pequenas
+EMBED_BATCH_SIZE = 64
+
+def _limpar_temporarios_antigos() -> None:
+    """Remove exportações abandonadas; as recentes podem ser de outro processo ainda exportando."""
+    limite = time.time() - _IDADE_MAX_TEMPORARIO
+    for nome in os.listdir(CACHE_EMBEDDINGS):
+        caminho = os.path.join(CACHE_EMBEDDINGS, nome)
+        try:
+            if nome.startswith(".tmp-") and os.path.getmtime(caminho) < limite:
+                shutil.rmtree(caminho, ignore_errors=True)
+        except OSError:
+            continue
+
+class OnnxInt8Embedding(BaseEmbedding):
+    """Embedding via ONNX Runtime com pesos INT8 (kernels AVX-512 VNNI)."""
+
+    max_length: int = 512
+    query_instruction: Optional[str] = None
+    text_instruction: Optional[str] = None
+
+    _model: Any = PrivateAttr()
+    _tokenizer: Any = PrivateAttr()
+
+    def __init__(self, model_name: str, model: Any, tokenizer: Any, **kwargs: Any):
+        # Modelos E5 foram treinados com prefixos de consulta/passagem
+        if "e5" in model_name.lower():
+            kwargs.setdefault("query_instruction", "query: ")
+            kwargs.setdefault("text_instruction", "passage: ")
+        kwargs.setdefault("embed_batch_size", EMBED_BATCH_SIZE)
+        super().__init__(model_name=model_name, **kwargs)
+        self._model = model
+        self._tokenizer = tokenizer
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "OnnxInt8Embedding"
+
+    def encode_batch(self, texts: List[str], instrucao: Optional[str] = None) -> np.ndarray:
+        """Codifica uma lista de textos em uma única execução da sessão ONNX.
+        
+        O padding vai até um múltiplo de 8 tokens para manter as dimensões
+        alinhadas aos kernels INT8.
+        """
+        if instrucao:
+            texts = [instrucao + texto for texto in texts]
+
+        entradas = self._tokenizer(
+            texts,
+            padding=True,
+            pad_to_multiple_of=8,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np"
+        )
+        saida = self._model(**entradas).last_hidden_state
+
+        mascara = entradas["attention_mask"][..., None].astype(saida.dtype)
+        vetores = (saida * mascara).sum(axis=1) / np.clip(mascara.sum(axis=1), 1e-9, None)
+        vetores /= np.clip(np.linalg.norm(vetores, axis=1, keepdims=True), 1e-12, None)
+        return vetores
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.encode_batch([query], self.query_instruction)[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self.encode_batch([text], self.text_instruction)[0].tolist()
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.encode_batch(texts, self.text_instruction).tolist()
+
+class RobustEmbeddingManager:
+    """Gerenciador robusto de embeddings com fallbacks."""
+    
+    @staticmethod
+    def get_embedding_model():
+        """Tenta diferentes modelos de embedding em ordem de preferência."""
+        
+        embedding_options = [
+            {
+                "name": "intfloat/multilingual-e5-large",
+                "description": "E5 Large Multilingual - Melhor qualidade"
+            },
+            {
+                "name": "intfloat/multilingual-e5-base", 
+                "description": "E5 Base Multilingual - Balanceado"
+            },
+            {
+                "name": "intfloat/multilingual-e5-small",
+                "description": "E5 Small Multilingual - Mais rápido"
+            },
+            {
+                "name": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
+                "description": "MiniLM Multilingual - Compatibilidade"
+            },
+            {
+                "name": "sentence-transformers/all-MiniLM-L6-v2",
+                "description": "All-MiniLM - Fallback confiável"
+            }
+        ]
+        
+        onnx_disponivel = True
+        
+        for option in embedding_options:
+            if onnx_disponivel:
+                try:
+                    embed_model = RobustEmbeddingManager._carregar_onnx_int8(option["name"])
+                    logger.info(f"✅ Sucesso! Usando: {option['name']} (ONNX INT8)")
+                    return embed_model
+                except ImportError as e:
+                    onnx_disponivel = False
+                    logger.warning(f"⚠️ ONNX Runtime indisponível - instale com: pip install optimum[onnxruntime] ({e})")
+                except Exception as e:
+                    logger.warning(f"⚠️ ONNX falhou para {option['name']}, usando PyTorch: {str(e)[:100]}")
+            
+            try:
+                logger.info(f"Tentando carregar: {option['name']} - {option['description']}")
+                
+                from llama_index.embeddings.huggingface import HuggingFaceEmbedding
+                embed_model = HuggingFaceEmbedding(
+                    model_name=option["name"],
+                    embed_batch_size=EMBED_BATCH_SIZE,
+                    max_length=512,
+                    normalize=True
+                )
+                RobustEmbeddingManager._quantizar_int8(embed_model)
+
+                logger.info(f"✅ Sucesso! Usando: {option['name']}")
+                return embed_model
+                
+            except Exception as e:
+                logger.warning(f"❌ Falhou {option['name']}: {str(e)[:100]}")
+                continue
+        
+        logger.info("🔄 Usando embedding padrão do LlamaIndex")
+        return None
+
+    @staticmethod
+    def _carregar_onnx_int8(model_name: str) -> OnnxInt8Embedding:
+        """Exporta e quantiza o modelo para ONNX INT8 na primeira execução e reutiliza o cache."""
+        from optimum.onnxruntime import ORTModelForFeatureExtraction, ORTQuantizer
+        from optimum.onnxruntime.configuration import AutoQuantizationConfig
+        from transformers import AutoTokenizer
+
+        cache_dir = os.path.join(CACHE_EMBEDDINGS, model_name.replace("/", "__"))
+        arquivo_onnx = "model_quantized.onnx"
+        arquivos_cache = (arquivo_onnx, "tokenizer_config.json")
+
+        if not all(os.path.exists(os.path.join(cache_dir, arquivo)) for arquivo in arquivos_cache):
+            logger.info(f"🔧 Exportando {model_name} para ONNX INT8 (apenas na primeira execução)...")
+            # Tudo é gravado em um diretório temporário e só então movido para o
+            # lugar: uma falha no meio não deixa um cache pela metade
+            os.makedirs(CACHE_EMBEDDINGS, exist_ok=True)
+            _limpar_temporarios_antigos()
+            tmp_dir = tempfile.mkdtemp(prefix=".tmp-", dir=CACHE_EMBEDDINGS)
+            try:
+                modelo_fp32 = ORTModelForFeatureExtraction.from_pretrained(model_name, export=True)
+                quantizer = ORTQuantizer.from_pretrained(modelo_fp32)
+                qconfig = AutoQuantizationConfig.avx512_vnni(is_static=False, per_channel=False)
+                quantizer.quantize(save_dir=tmp_dir, quantization_config=qconfig)
+                AutoTokenizer.from_pretrained(model_name).save_pretrained(tmp_dir)
+
+                shutil.rmtree(cache_dir, ignore_errors=True)  # cache incompleto de versões anteriores
+                os.replace(tmp_dir, cache_dir)
+            finally:
+                shutil.rmtree(tmp_dir, ignore_errors=True)
+
+        modelo = ORTModelForFeatureExtraction.from_pretrained(cache_dir, file_name=arquivo_onnx)
+        tokenizer = AutoTokenizer.from_pretrained(cache_dir)
+        return OnnxInt8Embedding(model_name=model_name, model=modelo, tokenizer=tokenizer)
+
+    @staticmethod
+    def _quantizar_int8(embed_model) -> None:
+        """Aplica quantização dinâmica INT8 nas camadas Linear do modelo (CPU)."""
+        try:
+            import torch
+
+            modelo = embed_model._model
+            if next(modelo.parameters()).device.type != "cpu":
+                return
+
+            embed_model._model = torch.quantization.quantize_dynamic(
+                modelo, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            logger.info("⚡ Embedding quantizado para INT8")
+
+        except Exception as e:
+            logger.warning(f"⚠️ Quantização INT8 indisponível, mantendo FP32: {str(e)[:100]}")
@@ -0,0 +1,198 @@
+"""Processo dedicado ao modelo de embeddings.
+
+O modelo (ONNX INT8 ou HuggingFace) é carregado uma única vez em um processo
+separado, isolando a inferência pesada de CPU do processo principal do agente.
+O módulo também funciona em lote pela linha de comando:
+
+    python embedding_worker.py --batch < textos.txt > embeddings.jsonl
+"""
+
+import argparse
+import asyncio
+import atexit
+import contextlib
+import itertools
+import json
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from typing import Any, List, Optional
+
+import numpy as np
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
+
+from embedding_models import RobustEmbeddingManager
+
+logger = logging.getLogger(__name__)
+
+
+def _carregar_modelo():
+    """Carrega o modelo de embeddings no processo atual."""
+    return RobustEmbeddingManager.get_embedding_model()
+
+
+def _servir(conn) -> None:
+    """Loop do worker: recebe (request_id, tipo, textos) e devolve (request_id, vetores)."""
+    try:
+        modelo = _carregar_modelo()
+    except Exception as e:
+        conn.send(("erro", str(e)))
+        return
+
+    if modelo is None:
+        conn.send(("sem_modelo", "nenhum modelo de embedding disponível"))
+        return
+
+    conn.send(("pronto", modelo.model_name))
+
+    while True:
+        try:
+            pedido = conn.recv()
+        except EOFError:
+            break
+        if pedido is None:
+            break
+
+        request_id, tipo, textos = pedido
+        try:
+            if tipo == "query":
+                vetores = [modelo.get_query_embedding(texto) for texto in textos]
+            else:
+                vetores = modelo.get_text_embedding_batch(textos)
+            conn.send((request_id, np.asarray(vetores, dtype=np.float32)))
+        except Exception as e:
+            conn.send((request_id, RuntimeError(str(e))))
+
+    conn.close()
+
+
+class EmbeddingWorker:
+    """Mantém o processo worker vivo e encaminha pedidos de embedding pelo pipe."""
+
+    def __init__(self, timeout_inicio: Optional[float] = None):
+        metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+        ctx = multiprocessing.get_context(metodo)
+
+        self._conn, conn_worker = ctx.Pipe()
+        self._processo = ctx.Process(target=_servir, args=(conn_worker,), name="embedding-worker", daemon=True)
+        self._processo.start()
+        conn_worker.close()
+
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+
+        # Sem limite por padrão: o primeiro download/exportação do modelo pode
+        # levar muitos minutos e matar o worker no meio desperdiçaria o trabalho.
+        # Quem chama já espera em segundo plano; só desistimos se o processo morrer.
+        inicio = time.monotonic()
+        while not self._conn.poll(1):
+            if not self._processo.is_alive():
+                raise RuntimeError("worker de embeddings terminou durante o carregamento")
+            if timeout_inicio is not None and time.monotonic() - inicio > timeout_inicio:
+                self.fechar()
+                raise TimeoutError("worker de embeddings não respondeu a tempo")
+
+        try:
+            status, info = self._conn.recv()
+        except EOFError:
+            raise RuntimeError("worker de embeddings terminou durante o carregamento") from None
+        if status == "sem_modelo":
+            self.fechar()
+            raise LookupError(info)
+        if status != "pronto":
+            self.fechar()
+            raise RuntimeError(info)
+
+        self.model_name = info
+        atexit.register(self.fechar)
+
+    def embed(self, textos: List[str], tipo: str = "text") -> np.ndarray:
+        """Envia textos ao worker e devolve a matriz de embeddings (float32)."""
+        with self._lock:
+            request_id = next(self._ids)
+            self._conn.send((request_id, tipo, list(textos)))
+            resposta_id, resultado = self._conn.recv()
+
+        if resposta_id != request_id:
+            raise RuntimeError(f"resposta fora de ordem do worker ({resposta_id} != {request_id})")
+        if isinstance(resultado, Exception):
+            raise resultado
+        return resultado
+
+    def fechar(self) -> None:
+        """Encerra o worker de forma ordenada."""
+        with contextlib.suppress(OSError):
+            self._conn.send(None)
+        self._processo.join(timeout=5)
+        if self._processo.is_alive():
+            self._processo.terminate()
+
+
+class WorkerEmbedding(BaseEmbedding):
+    """BaseEmbedding que delega o cálculo ao processo worker."""
+
+    _worker: Any = PrivateAttr()
+
+    def __init__(self, worker: EmbeddingWorker, **kwargs: Any):
+        super().__init__(model_name=worker.model_name, **kwargs)
+        self._worker = worker
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "WorkerEmbedding"
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self._worker.embed([query], "query")[0].tolist()
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self._worker.embed([text])[0].tolist()
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self._worker.embed(texts).tolist()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Worker de embeddings do Agente IA")
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="lê um texto por linha do stdin e escreve um JSON por linha no stdout"
+    )
+    parser.add_argument("--tamanho-lote", type=int, default=64, help="textos por chamada ao modelo")
+    args = parser.parse_args(argv)
+
+    if not args.batch:
+        parser.print_help()
+        return 1
+
+    # Logs vão para stderr
+    logging.basicConfig(level=logging.INFO)
+
+    # stdout fica reservado para os resultados em JSON
+    with contextlib.redirect_stdout(sys.stderr):
+        modelo = _carregar_modelo()
+
+    if modelo is None:
+        print("❌ Nenhum modelo de embedding disponível", file=sys.stderr)
+        return 1
+
+    linhas = (linha.rstrip("\n") for linha in sys.stdin)
+    while True:
+        lote = list(itertools.islice(linhas, args.tamanho_lote))
+        if not lote:
+            break
+        for texto, vetor in zip(lote, modelo.get_text_embedding_batch(lote)):
+            sys.stdout.write(json.dumps({"texto": texto, "embedding": vetor}, ensure_ascii=False) + "\n")
+        sys.stdout.flush()
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,116 +4,464 @@ load_dotenv()
 
 import os
 import asyncio
-from typing import List, Dict, Any, Optional
+from contextlib import contextmanager
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Callable
 from llama_index.core import Settings, SimpleDirectoryReader, VectorStoreIndex, StorageContext, load_index_from_storage
 from llama_index.llms.groq import Groq
 from llama_index.core.tools import FunctionTool
+from llama_index.core.embeddings import BaseEmbedding
+from llama_index.core.bridge.pydantic import PrivateAttr
 from llama_index.core.agent import ReActAgent
 from llama_index.tools.tavily_research import TavilyToolSpec
-import arxiv
+from embedding_models import EMBED_BATCH_SIZE, RobustEmbeddingManager
+from embedding_worker import EmbeddingWorker, WorkerEmbedding
+import httpx
+from cachetools import TTLCache
+from lxml import etree
 from datetime import datetime
 import logging
 import re
+import bisect
+import json
+import math
+import threading
+import numpy as np
+
+# Configuração de logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+# Avaliado uma vez: no caminho quente os logs de depuração nem formatam a mensagem
+_DEBUG = logger.isEnabledFor(logging.DEBUG)
 
 # Tentar importar nest_asyncio para loops aninhados
 try:
     import nest_asyncio
     nest_asyncio.apply()
-    print("✅ nest_asyncio configurado")
+    logger.debug("✅ nest_asyncio configurado")
 except ImportError:
-    print("⚠️ nest_asyncio não disponível - instale com: pip install nest-asyncio")
+    logger.warning("⚠️ nest_asyncio não disponível - instale com: pip install nest-asyncio")
 
-# Configuração de logging
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+# Numba é opcional: sem ele o cálculo de IR em lote roda em NumPy puro
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+    logger.info("numba não disponível - IR em lote usará NumPy puro (pip install numba)")
 
-class RobustEmbeddingManager:
-    """Gerenciador robusto de embeddings com fallbacks."""
-    
-    @staticmethod
-    def get_embedding_model():
-        """Tenta diferentes modelos de embedding em ordem de preferência."""
-        
-        embedding_options = [
-            {
-                "name": "intfloat/multilingual-e5-large",
-                "description": "E5 Large Multilingual - Melhor qualidade"
-            },
-            {
-                "name": "intfloat/multilingual-e5-base", 
-                "description": "E5 Base Multilingual - Balanceado"
-            },
-            {
-                "name": "intfloat/multilingual-e5-small",
-                "description": "E5 Small Multilingual - Mais rápido"
-            },
-            {
-                "name": "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2",
-                "description": "MiniLM Multilingual - Compatibilidade"
-            },
-            {
-                "name": "sentence-transformers/all-MiniLM-L6-v2",
-                "description": "All-MiniLM - Fallback confiável"
-            }
-        ]
-        
-        for option in embedding_options:
-            try:
-                logger.info(f"Tentando carregar: {option['name']} - {option['description']}")
-                
-                from llama_index.embeddings.huggingface import HuggingFaceEmbedding
-                embed_model = HuggingFaceEmbedding(
-                    model_name=option["name"],
-                    max_length=512,
-                    normalize=True
-                )
-                
-                logger.info(f"✅ Sucesso! Usando: {option['name']}")
-                return embed_model
-                
-            except Exception as e:
-                logger.warning(f"❌ Falhou {option['name']}: {str(e)[:100]}")
+# Padrões de extração compilados uma única vez.
+# _RE_ALL cobre percentuais, períodos e valores monetários em uma só varredura;
+# números começam e terminam em dígito, e o lookahead impede que o número de
+# um percentual (ou o pedaço de um número maior) vire valor.
+_RE_ALL = re.compile(
+    r'(?P<pct>\d(?:[\d.,]*\d)?)\s*%'
+    r'|\s*(?P<per>\d+)\s*(?i:anos?|meses?|dias?)'
+    r'|R?\$?\s*(?P<money>\d(?:[\d.,]*\d)?)(?!\d|[.,]\d|\s*%)'
+)
+# Números citados na mensagem (sempre começam por dígito)
+_RE_NUMERO = re.compile(r'\d[\d.,]*')
+# Número no formato brasileiro (1.234,56) -> formato aceito por float (1234.56)
+_PTBR_TABLE = str.maketrans({'.': '', ',': '.'})
+_RE_ACADEMIC_STOP = re.compile(r'\b(busque|procure|artigos|científicos|papers|sobre)\b', re.IGNORECASE)
+
+# Palavras-chave de cada intenção, em ordem de prioridade (a primeira que casar vence)
+_INTENCOES = (
+    ("ir", ('imposto de renda', 'calcular ir', 'ir de')),
+    ("pct", ('% de', 'porcent', 'percentual de')),
+    ("jc", ('juros compostos', 'compound interest', 'montante')),
+    ("arxiv", ('artigos científicos', 'papers', 'arxiv', 'pesquisa acadêmica')),
+)
+_PRIORIDADE_INTENCOES = tuple(tag for tag, _ in _INTENCOES)
+
+# Autômato Aho-Corasick: todas as palavras-chave em uma única varredura do texto
+try:
+    import ahocorasick
+    _AUTOMATO_INTENCOES = ahocorasick.Automaton()
+    for _tag, _termos in _INTENCOES:
+        for _termo in _termos:
+            _AUTOMATO_INTENCOES.add_word(_termo, (_tag, _termo))
+    _AUTOMATO_INTENCOES.make_automaton()
+except ImportError:
+    _AUTOMATO_INTENCOES = None
+    logger.info("pyahocorasick não disponível - detecção de intenção usará busca simples (pip install pyahocorasick)")
+
+def _inicio_valido(texto: str, inicio: int, termo: str) -> bool:
+    """Palavras-chave alfabéticas só valem no início de palavra ('ir de' não casa em 'partir de')."""
+    return inicio == 0 or not termo[0].isalnum() or not texto[inicio - 1].isalnum()
+
+def detectar_intencoes(texto_lower: str) -> set:
+    """Retorna todas as intenções cujas palavras-chave aparecem no texto (já em minúsculas)."""
+    encontradas = set()
+    if _AUTOMATO_INTENCOES is not None:
+        for fim, (tag, termo) in _AUTOMATO_INTENCOES.iter(texto_lower):
+            if _inicio_valido(texto_lower, fim - len(termo) + 1, termo):
+                encontradas.add(tag)
+    else:
+        for tag, termos in _INTENCOES:
+            for termo in termos:
+                inicio = texto_lower.find(termo)
+                while inicio != -1 and not _inicio_valido(texto_lower, inicio, termo):
+                    inicio = texto_lower.find(termo, inicio + 1)
+                if inicio != -1:
+                    encontradas.add(tag)
+                    break
+    return encontradas
+
+def intencao_prioritaria(encontradas: set) -> Optional[str]:
+    """Retorna a intenção de maior prioridade entre as encontradas."""
+    return next((tag for tag in _PRIORIDADE_INTENCOES if tag in encontradas), None)
+
+# Busca no arXiv só dispensa o ReAct com um pedido explícito de busca
+_RE_COMANDO_BUSCA = re.compile(r'\b(busque|procure)\b', re.IGNORECASE)
+# IR mensal (ou salário) ou de outro ano: a tabela anual de 2024 não se aplica direto
+_RE_IR_AMBIGUO = re.compile(
+    r'\b(m[eê]s|meses|mensa\w*|sal[aá]rios?)\b|(?<![\d.,])(19|20)\d\d(?![\d,]|\.\d)',
+    re.IGNORECASE
+)
+# "80 mil", "1,5 milhão", "10k": o extrator leria só o número
+_RE_MULTIPLICADOR = re.compile(r'(?:\b|(?<=\d))(mil|milh(?:ão|ao|ões|oes)|bilh(?:ão|ao|ões|oes)|k)\b', re.IGNORECASE)
+# Outros cálculos que o atalho de juros compostos não cobre
+_RE_JC_EXCLUI = re.compile(r'\b(juros\s+simples|aportes?)\b', re.IGNORECASE)
+# Unidades da taxa ("ao mês", "a.a.") e do período ("12 meses"), agrupadas pelo mesmo nome
+_RE_UNIDADE_TAXA = re.compile(
+    r'(?P<meses>\bao\s+m[eê]s\b|\ba\.m\.|\bmensa(?:l|is)\b)'
+    r'|(?P<anos>\bao\s+ano\b|\ba\.a\.|\banua(?:l|is)\b)'
+    r'|(?P<dias>\bao\s+dia\b|\ba\.d\.|\bdi[aá]ri[ao]s?\b)',
+    re.IGNORECASE
+)
+_RE_UNIDADE_PERIODO = re.compile(r'\d+\s*(?:(?P<anos>anos?)|(?P<meses>meses|m[eê]s)|(?P<dias>dias?))\b', re.IGNORECASE)
+
+def _ir_confiavel(message: str) -> bool:
+    """Valor anual em reais, sem multiplicadores: a tabela de 2024 se aplica direto."""
+    return not _RE_MULTIPLICADOR.search(message) and not _RE_IR_AMBIGUO.search(message)
+
+def _pct_confiavel(message: str) -> bool:
+    """Porcentagem sem multiplicadores no valor base."""
+    return not _RE_MULTIPLICADOR.search(message)
+
+def _jc_confiavel(message: str) -> bool:
+    """Juros compostos simples: sem multiplicadores, aportes ou juros simples, e
+    com a taxa (se tiver unidade) na mesma unidade do período."""
+    if _RE_MULTIPLICADOR.search(message) or _RE_JC_EXCLUI.search(message):
+        return False
+    periodo = _RE_UNIDADE_PERIODO.search(message)
+    taxa = _RE_UNIDADE_TAXA.search(message)
+    return periodo is not None and (taxa is None or taxa.lastgroup == periodo.lastgroup)
+
+# API Atom do arXiv
+ARXIV_API_URL = "https://export.arxiv.org/api/query"
+_ARXIV_NS = {"atom": "http://www.w3.org/2005/Atom", "arxiv": "http://arxiv.org/schemas/atom"}
+
+# Cache das buscas externas: consultas repetidas (retentativas do ReAct,
+# perguntas refeitas pelo usuário) não voltam à rede por 1 hora.
+_CACHE_ARXIV = TTLCache(maxsize=256, ttl=3600)
+_CACHE_WEB = TTLCache(maxsize=256, ttl=3600)
+
+def _chave_busca(query: str, max_results: int) -> tuple:
+    """Chave normalizada de cache para consultas de busca."""
+    return (query.strip().lower(), max_results)
+
+# Templates das respostas das ferramentas: o texto é montado uma vez no
+# carregamento do módulo e cada chamada só preenche os campos.
+_SEP25 = '=' * 25
+_SEP30 = '=' * 30
+_SEP45 = '=' * 45
+_SEP60 = '=' * 60
+
+_IR_TEMPLATE = """
+🧮 **CÁLCULO DO IMPOSTO DE RENDA {ano}**
+{sep}
+💰 **Rendimento Bruto**: R$ {rendimento:,.2f}
+📊 **Faixa**: {faixa}
+📈 **Alíquota**: {aliquota_pct:.1f}%
+➖ **Dedução**: R$ {deducao:,.2f}
+💸 **Imposto Devido**: R$ {imposto:,.2f}
+💵 **Renda Líquida**: R$ {liquida:,.2f}
+{sep}
+
+""".lstrip().format
+
+_IR_LOTE_TEMPLATE = """
+🧮 **IMPOSTO DE RENDA EM LOTE {ano}**
+{sep}
+{tabela}
+{sep}
+📋 **Rendimentos**: {quantidade}
+💰 **Total Bruto**: R$ {total_rend:,.2f}
+💸 **Total de Imposto**: R$ {total_imp:,.2f}
+📊 **Alíquota Efetiva Média**: {efetiva_pct:.2f}%
+""".strip().format
+
+_PORCENTAGEM_TEMPLATE = """
+📊 **CÁLCULO DE PORCENTAGEM**
+{sep}
+💰 **Valor Base**: {valor:,.2f}
+📈 **Percentual**: {percentual}%
+💵 **Resultado**: {resultado:,.2f}
+📋 **Fórmula**: {valor:,.2f} × {percentual}% = {resultado:,.2f}
+""".strip().format
+
+_JUROS_COMPOSTOS_TEMPLATE = """
+📈 **JUROS COMPOSTOS**
+{sep}
+💰 **Capital Inicial**: R$ {principal:,.2f}
+📊 **Taxa**: {taxa_pct:.2f}% ao período
+⏱️ **Período**: {periodo} períodos
+💸 **Montante Final**: R$ {montante:,.2f}
+💵 **Juros Ganhos**: R$ {juros:,.2f}
+📈 **Rendimento**: {rendimento_pct:.2f}%
+""".strip().format
+
+_CRONOGRAMA_TEMPLATE = """
+📅 **CRONOGRAMA DE JUROS COMPOSTOS**
+{sep}
+💰 **Capital Inicial**: R$ {principal:,.2f}
+📊 **Taxa**: {taxa_pct:.2f}% ao período
+{tabela}
+{sep}
+💸 **Montante Final**: R$ {montante:,.2f}
+""".strip().format
+
+_JUROS_SIMPLES_TEMPLATE = """
+📊 **JUROS SIMPLES**
+{sep}
+💰 **Capital**: R$ {principal:,.2f}
+📊 **Taxa**: {taxa_pct:.2f}%
+⏱️ **Período**: {periodo}
+💸 **Juros**: R$ {juros:,.2f}
+💵 **Montante**: R$ {montante:,.2f}
+""".strip().format
+
+# Fallback quando os valores foram informados, mas o atalho direto foi
+# descartado por ambiguidade e o ReAct também não respondeu
+_CONFIRMACAO_TEMPLATE = """
+❓ **Não consegui confirmar o cálculo de {calculo}.**
+
+Entendi: {entendido}
+Mas a pergunta tem algo que muda o resultado (valor mensal ou de outro ano,
+"mil"/"milhão", taxa e período em unidades diferentes ou mais de um cálculo).
+
+**Reformule de forma direta, por exemplo:** "{exemplo}"
+""".strip().format
+
+_ARTIGO_TEMPLATE = """
+📄 **ARTIGO {i}**
+📝 **Título**: {titulo}
+👥 **Autores**: {autores}
+📂 **Categoria**: {categoria}
+📅 **Data**: {data}
+🔗 **Link**: {link}
+📖 **Resumo**: {resumo}
+""".strip().format
+
+@contextmanager
+def _usar_llm(llm):
+    """Troca Settings.llm durante uma consulta e restaura o anterior ao sair."""
+    anterior = Settings.llm
+    Settings.llm = llm
+    try:
+        yield llm
+    finally:
+        Settings.llm = anterior
+
+def _executar_async(coro):
+    """Executa uma corrotina a partir de código síncrono.
+
+    Dentro de um loop já em execução (e sem depender do nest_asyncio) a
+    corrotina roda em uma thread auxiliar com seu próprio loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="async-bridge") as executor:
+        return executor.submit(asyncio.run, coro).result()
+
+def _completar_future(future: Future, fn: Callable, *args, **kwargs) -> None:
+    """Executa fn e entrega o resultado (ou a exceção) ao future."""
+    if not future.set_running_or_notify_cancel():
+        return
+    try:
+        future.set_result(fn(*args, **kwargs))
+    except BaseException as e:
+        future.set_exception(e)
+
+def _ir_vectorized(rend: np.ndarray, limites: np.ndarray, aliquotas: np.ndarray, deducoes: np.ndarray) -> np.ndarray:
+    """Imposto devido por rendimento: busca binária da faixa + gather de alíquota/dedução."""
+    idx = np.searchsorted(limites, rend)
+    return np.maximum(0.0, rend * aliquotas[idx] - deducoes[idx])
+
+if njit is not None:
+    # cache=True grava o código compilado em disco: só a primeira execução paga a compilação
+    _ir_vectorized = njit(cache=True)(_ir_vectorized)
+
+# Documentos locais indexados e diretório onde o índice vetorial é persistido
+DOCS_DIR = "./docs"
+INDEX_DIR = "./.idx"
+
+def _assinatura_documentos(docs_dir: str) -> Dict[str, float]:
+    """Mapeia cada documento (caminho relativo) ao seu mtime; muda se algo for editado, criado ou removido."""
+    assinatura = {}
+    for raiz, pastas, nomes in os.walk(docs_dir):
+        pastas[:] = [pasta for pasta in pastas if not pasta.startswith('.')]
+        for nome in nomes:
+            if nome.startswith('.'):
                 continue
-        
+            caminho = os.path.join(raiz, nome)
+            assinatura[os.path.relpath(caminho, docs_dir)] = os.path.getmtime(caminho)
+    return assinatura
+
+class _LazyEmbed(BaseEmbedding):
+    """Embedding que espera o modelo carregado em segundo plano só no primeiro uso."""
+
+    _future: Any = PrivateAttr()
+    _modelo: Any = PrivateAttr(default=None)
+
+    def __init__(self, future: Future, **kwargs: Any):
+        kwargs.setdefault("embed_batch_size", EMBED_BATCH_SIZE)
+        super().__init__(model_name="lazy", **kwargs)
+        self._future = future
+
+    @classmethod
+    def class_name(cls) -> str:
+        return "LazyEmbed"
+
+    @property
+    def nome_resolvido(self) -> str:
+        """Nome do modelo que de fato gera os vetores (aguarda o carregamento)."""
+        return self.resolver().model_name
+
+    def resolver(self) -> BaseEmbedding:
+        """Obtém o modelo real, bloqueando apenas se o carregamento ainda não terminou."""
+        if self._modelo is None:
+            modelo = self._future.result()
+            if modelo is None:
+                from llama_index.core.embeddings.utils import resolve_embed_model
+                logger.info("🔄 Usando embedding padrão do LlamaIndex")
+                modelo = resolve_embed_model("default")
+            self._modelo = modelo
+        return self._modelo
+
+    def _get_query_embedding(self, query: str) -> List[float]:
+        return self.resolver().get_query_embedding(query)
+
+    async def _aget_query_embedding(self, query: str) -> List[float]:
+        return await asyncio.to_thread(self._get_query_embedding, query)
+
+    def _get_text_embedding(self, text: str) -> List[float]:
+        return self.resolver().get_text_embedding(text)
+
+    def _get_text_embeddings(self, texts: List[str]) -> List[List[float]]:
+        return self.resolver().get_text_embedding_batch(texts)
+
+def _carregar_embeddings() -> Optional[BaseEmbedding]:
+    """Carrega o modelo de embeddings em um processo dedicado (embedding_worker).
+
+    Se o worker não subir, o modelo é carregado no processo principal.
+    """
+    try:
+        worker = EmbeddingWorker()
+        logger.info("✅ Embeddings em processo dedicado: %s", worker.model_name)
+        return WorkerEmbedding(worker, embed_batch_size=EMBED_BATCH_SIZE)
+    except LookupError:
         logger.info("🔄 Usando embedding padrão do LlamaIndex")
         return None
+    except Exception as e:
+        logger.warning("⚠️ Worker de embeddings indisponível, carregando no processo principal: %s", str(e)[:100])
+    return RobustEmbeddingManager.get_embedding_model()
 
 class ImprovedFinancialAgent:
+    # Tabelas progressivas do IR: limites superiores ordenados para busca binária
+    _LIMITS_2024 = (28559.70, 42253.25, 56717.56, 74414.84, float('inf'))
+    _DED_2024 = (0, 2141.98, 5304.90, 9756.12, 14067.51)
+    # Valores simplificados para outros anos
+    _LIMITS_OUTROS = (28000, 42000, 56000, 74000, float('inf'))
+    _DED_OUTROS = (0, 2100, 5300, 9700, 14000)
+    _ALIQ_IR = (0.0, 0.075, 0.15, 0.225, 0.275)
+    _NOMES_IR = ("Isento", "7,5%", "15%", "22,5%", "27,5%")
+    # Cópias float64 contíguas das tabelas para o cálculo em lote
+    _LIMITS_2024_NP = np.asarray(_LIMITS_2024, dtype=np.float64)
+    _DED_2024_NP = np.asarray(_DED_2024, dtype=np.float64)
+    _LIMITS_OUTROS_NP = np.asarray(_LIMITS_OUTROS, dtype=np.float64)
+    _DED_OUTROS_NP = np.asarray(_DED_OUTROS, dtype=np.float64)
+    _ALIQ_IR_NP = np.asarray(_ALIQ_IR, dtype=np.float64)
+
     def __init__(self):
-        print("🚀 Inicializando Agente IA Melhorado...")
+        logger.info("🚀 Inicializando Agente IA Melhorado...")
         
         # Verificar se as chaves estão carregadas
         groq_key = os.getenv("GROQ_API_KEY")
         tavily_key = os.getenv("TAVILY_API_KEY")
         
-        print(f"🔑 GROQ_API_KEY: {'✅ Carregada' if groq_key else '❌ Não encontrada'}")
-        print(f"🔑 TAVILY_API_KEY: {'✅ Carregada' if tavily_key else '⚠️ Não encontrada (opcional)'}")
+        logger.info("🔑 GROQ_API_KEY: %s", '✅ Carregada' if groq_key else '❌ Não encontrada')
+        logger.info("🔑 TAVILY_API_KEY: %s", '✅ Carregada' if tavily_key else '⚠️ Não encontrada (opcional)')
         
         if not groq_key:
             raise ValueError("GROQ_API_KEY não encontrada no arquivo .env")
         
-        # Configuração do LLM
-        self.llm = Groq(
+        # Configuração dos LLMs: o 70B fica com o raciocínio do ReAct e o 8B
+        # responde às chamadas diretas, com menor latência por token
+        self.llm_big = Groq(
             model="llama-3.3-70b-versatile",
             api_key=groq_key,
             temperature=0.1
         )
-        print("✅ LLM Groq configurado")
+        self.llm_fast = Groq(
+            model="llama-3.1-8b-instant",
+            api_key=groq_key,
+            temperature=0.1
+        )
+        self.llm = self.llm_big
+        logger.debug("✅ LLMs Groq configurados")
         
-        # Configuração robusta de embeddings
-        embed_model = RobustEmbeddingManager.get_embedding_model()
-        if embed_model:
-            Settings.embed_model = embed_model
+        # Configuração robusta de embeddings, carregada em segundo plano
+        # enquanto o usuário digita a primeira pergunta
+        # (thread daemon: sair do REPL não espera download/exportação do modelo)
+        self._embed_future = Future()
+        threading.Thread(
+            target=_completar_future,
+            args=(self._embed_future, _carregar_embeddings),
+            name="embed-warmup",
+            daemon=True
+        ).start()
+        Settings.embed_model = _LazyEmbed(self._embed_future)
+        logger.debug("🔄 Embeddings carregando em segundo plano")
         
         Settings.llm = self.llm
         
+        # Índice vetorial dos documentos locais (cache em disco), criado na primeira consulta
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._tem_documentos = os.path.isdir(DOCS_DIR) and bool(_assinatura_documentos(DOCS_DIR))
+        
         # Inicializar ferramentas
         self.setup_tools()
-        print(f"✅ {len(self.tools)} ferramentas configuradas")
+        logger.debug("✅ %d ferramentas configuradas", len(self.tools))
+        
+        # Intenções determinísticas respondidas sem LLM
+        self._intent_dispatch = self._montar_despacho()
         
         # Criar agente ReAct
         self.agent = self.create_react_agent()
-        print("✅ Agente ReAct inicializado")
+        logger.info("✅ Agente ReAct inicializado")
+
+    @classmethod
+    def _tabela_ir(cls, ano: int) -> tuple:
+        """Retorna (limites, deduções) da tabela do ano informado."""
+        if ano == 2024:
+            return cls._LIMITS_2024, cls._DED_2024
+        return cls._LIMITS_OUTROS, cls._DED_OUTROS
+
+    @classmethod
+    def _calcular_ir_vetorizado(cls, rendimentos: np.ndarray, ano: int = 2024) -> np.ndarray:
+        """Calcula o imposto devido para um array de rendimentos de uma só vez."""
+        if ano == 2024:
+            limites, deducoes = cls._LIMITS_2024_NP, cls._DED_2024_NP
+        else:
+            limites, deducoes = cls._LIMITS_OUTROS_NP, cls._DED_OUTROS_NP
+        rendimentos = np.ascontiguousarray(rendimentos, dtype=np.float64)
+        return _ir_vectorized(rendimentos, limites, cls._ALIQ_IR_NP, deducoes)
 
     def imposto_renda_melhorado(self, rendimento: float, ano: int = 2024) -> str:
         """Calcula o imposto de renda com validações robustas."""
@@ -121,53 +469,76 @@ class ImprovedFinancialAgent:
             if rendimento < 0:
                 return "❌ Rendimento não pode ser negativo."
             
-            # Tabela 2024 (valores reais)
-            if ano == 2024:
-                faixas = [
-                    (28559.70, 0.0, 0, "Isento"),
-                    (42253.25, 0.075, 2141.98, "7,5%"),
-                    (56717.56, 0.15, 5304.90, "15%"),
-                    (74414.84, 0.225, 9756.12, "22,5%"),
-                    (float('inf'), 0.275, 14067.51, "27,5%")
-                ]
+            limites, deducoes = self._tabela_ir(ano)
+            idx = bisect.bisect_left(limites, rendimento)
+            aliquota = self._ALIQ_IR[idx]
+            deducao = deducoes[idx]
+            faixa_nome = self._NOMES_IR[idx]
+            
+            imposto_bruto = rendimento * aliquota
+            imposto_devido = max(0, imposto_bruto - deducao)
+            
+            resultado = _IR_TEMPLATE(
+                sep=_SEP45,
+                ano=ano,
+                rendimento=rendimento,
+                faixa=faixa_nome,
+                aliquota_pct=aliquota * 100,
+                deducao=deducao,
+                imposto=imposto_devido,
+                liquida=rendimento - imposto_devido
+            )
+            
+            if imposto_devido == 0:
+                resultado += "✅ **ISENTO DE IMPOSTO DE RENDA!**"
             else:
-                # Valores simplificados para outros anos
-                faixas = [
-                    (28000, 0.0, 0, "Isento"),
-                    (42000, 0.075, 2100, "7,5%"),
-                    (56000, 0.15, 5300, "15%"),
-                    (74000, 0.225, 9700, "22,5%"),
-                    (float('inf'), 0.275, 14000, "27,5%")
-                ]
+                percentual_efetivo = (imposto_devido / rendimento) * 100
+                resultado += f"📊 **Alíquota Efetiva**: {percentual_efetivo:.2f}%"
             
-            for limite, aliquota, deducao, faixa_nome in faixas:
-                if rendimento <= limite:
-                    imposto_bruto = rendimento * aliquota
-                    imposto_devido = max(0, imposto_bruto - deducao)
-                    
-                    resultado = f"""
-🧮 **CÁLCULO DO IMPOSTO DE RENDA {ano}**
-{'='*45}
-💰 **Rendimento Bruto**: R$ {rendimento:,.2f}
-📊 **Faixa**: {faixa_nome}
-📈 **Alíquota**: {aliquota*100:.1f}%
-➖ **Dedução**: R$ {deducao:,.2f}
-💸 **Imposto Devido**: R$ {imposto_devido:,.2f}
-💵 **Renda Líquida**: R$ {rendimento - imposto_devido:,.2f}
-{'='*45}
-                    """
-                    
-                    if imposto_devido == 0:
-                        resultado += "\n✅ **ISENTO DE IMPOSTO DE RENDA!**"
-                    else:
-                        percentual_efetivo = (imposto_devido / rendimento) * 100
-                        resultado += f"\n📊 **Alíquota Efetiva**: {percentual_efetivo:.2f}%"
-                    
-                    return resultado.strip()
-                    
+            return resultado
+
         except Exception as e:
             return f"❌ Erro no cálculo: {str(e)}"
 
+    def imposto_renda_lote(self, rendimentos: str, ano: int = 2024) -> str:
+        """Calcula o imposto de renda para uma lista JSON de rendimentos."""
+        try:
+            valores = json.loads(rendimentos) if isinstance(rendimentos, str) else rendimentos
+            rend = np.asarray(valores, dtype=np.float64).ravel()
+            
+            if rend.size == 0:
+                return "❌ Informe ao menos um rendimento."
+            # NaN/inf cairiam fora da tabela de faixas (o kernel njit não checa limites)
+            if not np.isfinite(rend).all():
+                return "❌ Rendimentos devem ser números finitos."
+            if (rend < 0).any():
+                return "❌ Rendimentos não podem ser negativos."
+            
+            impostos = self._calcular_ir_vetorizado(rend, ano)
+            
+            linhas = [
+                f"{i}. R$ {r:,.2f} → Imposto: R$ {imp:,.2f}"
+                for i, (r, imp) in enumerate(zip(rend[:20], impostos[:20]), 1)
+            ]
+            if rend.size > 20:
+                linhas.append(f"... e mais {rend.size - 20} rendimentos")
+            
+            total_rend = rend.sum()
+            total_imp = impostos.sum()
+            
+            return _IR_LOTE_TEMPLATE(
+                sep=_SEP45,
+                ano=ano,
+                tabela="\n".join(linhas),
+                quantidade=rend.size,
+                total_rend=total_rend,
+                total_imp=total_imp,
+                efetiva_pct=(total_imp / total_rend * 100) if total_rend else 0
+            )
+            
+        except Exception as e:
+            return f"❌ Erro no cálculo em lote: {str(e)}"
+
     def calculadora_financeira_geral(self, tipo: str, **kwargs) -> str:
         """Calculadora financeira para diversos cálculos."""
         try:
@@ -180,14 +551,9 @@ class ImprovedFinancialAgent:
                 
                 resultado = valor * (percentual / 100)
                 
-                return f"""
-📊 **CÁLCULO DE PORCENTAGEM**
-{'='*30}
-💰 **Valor Base**: {valor:,.2f}
-📈 **Percentual**: {percentual}%
-💵 **Resultado**: {resultado:,.2f}
-📋 **Fórmula**: {valor:,.2f} × {percentual}% = {resultado:,.2f}
-                """.strip()
+                return _PORCENTAGEM_TEMPLATE(
+                    sep=_SEP30, valor=valor, percentual=percentual, resultado=resultado
+                )
                 
             elif tipo.lower() == "juros_compostos":
                 principal = kwargs.get('principal', 0)
@@ -197,19 +563,53 @@ class ImprovedFinancialAgent:
                 if principal <= 0 or taxa <= 0 or periodo <= 0:
                     return "❌ Valores devem ser positivos para juros compostos"
                 
-                montante = principal * (1 + taxa) ** periodo
+                montante = principal * math.pow(1.0 + taxa, periodo)
                 juros = montante - principal
                 
-                return f"""
-📈 **JUROS COMPOSTOS**
-{'='*30}
-💰 **Capital Inicial**: R$ {principal:,.2f}
-📊 **Taxa**: {taxa*100:.2f}% ao período
-⏱️ **Período**: {periodo} períodos
-💸 **Montante Final**: R$ {montante:,.2f}
-💵 **Juros Ganhos**: R$ {juros:,.2f}
-📈 **Rendimento**: {((montante/principal-1)*100):.2f}%
-                """.strip()
+                return _JUROS_COMPOSTOS_TEMPLATE(
+                    sep=_SEP30,
+                    principal=principal,
+                    taxa_pct=taxa * 100,
+                    periodo=periodo,
+                    montante=montante,
+                    juros=juros,
+                    rendimento_pct=(montante / principal - 1) * 100
+                )
+                
+            elif tipo.lower() == "cronograma_juros":
+                principal = kwargs.get('principal', 0)
+                taxa = kwargs.get('taxa', 0) / 100
+                periodo = int(kwargs.get('periodo', 0))
+                
+                if principal <= 0 or taxa <= 0 or periodo <= 0:
+                    return "❌ Valores devem ser positivos para o cronograma de juros"
+                
+                # Só os períodos exibidos (12 primeiros e 12 últimos) são calculados:
+                # a fórmula fechada não depende dos anteriores, então um período
+                # enorme não aloca o cronograma inteiro
+                if periodo <= 24:
+                    periodos = np.arange(1, periodo + 1)
+                else:
+                    periodos = np.concatenate((np.arange(1, 13), np.arange(periodo - 11, periodo + 1)))
+                
+                # expm1/log1p evita cancelamento numérico com taxas pequenas
+                juros = principal * np.expm1(periodos * np.log1p(taxa))
+                montantes = principal + juros
+                
+                linhas = [
+                    f"{n:>4} | R$ {m:,.2f} | Juros: R$ {j:,.2f}"
+                    for n, m, j in zip(periodos, montantes, juros)
+                ]
+                if periodo > 24:
+                    linhas.insert(12, "   ...")
+                
+                return _CRONOGRAMA_TEMPLATE(
+                    sep=_SEP30,
+                    principal=principal,
+                    taxa_pct=taxa * 100,
+                    tabela="\n".join(linhas),
+                    montante=montantes[-1]
+                )
                 
             elif tipo.lower() == "juros_simples":
                 principal = kwargs.get('principal', 0)
@@ -219,61 +619,79 @@ class ImprovedFinancialAgent:
                 juros = principal * taxa * periodo
                 montante = principal + juros
                 
-                return f"""
-📊 **JUROS SIMPLES**
-{'='*25}
-💰 **Capital**: R$ {principal:,.2f}
-📊 **Taxa**: {taxa*100:.2f}%
-⏱️ **Período**: {periodo}
-💸 **Juros**: R$ {juros:,.2f}
-💵 **Montante**: R$ {montante:,.2f}
-                """.strip()
+                return _JUROS_SIMPLES_TEMPLATE(
+                    sep=_SEP25,
+                    principal=principal,
+                    taxa_pct=taxa * 100,
+                    periodo=periodo,
+                    juros=juros,
+                    montante=montante
+                )
                 
             else:
-                return f"❌ Tipo '{tipo}' não suportado. Use: juros_compostos, juros_simples"
+                return f"❌ Tipo '{tipo}' não suportado. Use: juros_compostos, cronograma_juros, juros_simples"
                 
         except Exception as e:
             return f"❌ Erro no cálculo financeiro: {str(e)}"
 
-    def consulta_arxiv_melhorada(self, query: str, max_results: int = 3) -> str:
-        """Consulta robusta ao arXiv."""
+    async def consulta_arxiv_melhorada(self, query: str, max_results: int = 3) -> str:
+        """Consulta robusta ao arXiv (assíncrona, sem bloquear o loop de eventos)."""
+        chave = _chave_busca(query, max_results)
+        if chave in _CACHE_ARXIV:
+            return _CACHE_ARXIV[chave]
+        
         try:
-            search = arxiv.Search(
-                query=query.strip(),
-                max_results=max_results,
-                sort_by=arxiv.SortCriterion.Relevance
-            )
+            params = {
+                "search_query": query.strip(),
+                "max_results": max_results,
+                "sortBy": "relevance"
+            }
+            async with httpx.AsyncClient(http2=True, timeout=10) as client:
+                resp = await client.get(ARXIV_API_URL, params=params)
+                resp.raise_for_status()
+            
+            feed = etree.fromstring(resp.content)
             
             resultados = []
-            for i, artigo in enumerate(search.results(), 1):
-                resumo = artigo.summary.replace('\n', ' ').strip()
+            for i, artigo in enumerate(feed.iterfind("atom:entry", _ARXIV_NS), 1):
+                titulo = " ".join(artigo.findtext("atom:title", "", _ARXIV_NS).split())
+                resumo = " ".join(artigo.findtext("atom:summary", "", _ARXIV_NS).split())
                 if len(resumo) > 250:
                     resumo = resumo[:250] + "..."
                 
-                autores = [autor.name for autor in artigo.authors[:3]]
-                if len(artigo.authors) > 3:
+                nomes = artigo.xpath("atom:author/atom:name/text()", namespaces=_ARXIV_NS)
+                autores = [nome.strip() for nome in nomes[:3]]
+                if len(nomes) > 3:
                     autores.append("et al.")
                 
-                resultado = f"""
-📄 **ARTIGO {i}**
-📝 **Título**: {artigo.title.strip()}
-👥 **Autores**: {', '.join(autores)}
-📂 **Categoria**: {artigo.primary_category}
-📅 **Data**: {artigo.published.strftime('%d/%m/%Y')}
-🔗 **Link**: {artigo.entry_id}
-📖 **Resumo**: {resumo}
-                """.strip()
-                resultados.append(resultado)
+                categoria = artigo.find("arxiv:primary_category", _ARXIV_NS)
+                publicado = datetime.strptime(artigo.findtext("atom:published", "", _ARXIV_NS)[:10], "%Y-%m-%d")
+                
+                resultados.append(_ARTIGO_TEMPLATE(
+                    i=i,
+                    titulo=titulo,
+                    autores=', '.join(autores),
+                    categoria=categoria.get('term') if categoria is not None else '-',
+                    data=publicado.strftime('%d/%m/%Y'),
+                    link=artigo.findtext('atom:id', '', _ARXIV_NS).strip(),
+                    resumo=resumo
+                ))
             
             if resultados:
-                header = f"🔍 **RESULTADOS PARA: '{query}'**\n{'='*60}"
-                return header + "\n\n" + "\n\n".join(resultados)
+                header = f"🔍 **RESULTADOS PARA: '{query}'**\n{_SEP60}"
+                resposta = header + "\n\n" + "\n\n".join(resultados)
+                _CACHE_ARXIV[chave] = resposta
+                return resposta
             else:
                 return f"❌ Nenhum artigo encontrado para: '{query}'"
                 
         except Exception as e:
             return f"❌ Erro na consulta ao arXiv: {str(e)}"
 
+    def consulta_arxiv_sync(self, query: str, max_results: int = 3) -> str:
+        """Versão síncrona de consulta_arxiv_melhorada para chamadores não assíncronos."""
+        return _executar_async(self.consulta_arxiv_melhorada(query, max_results))
+
     def busca_web_inteligente(self, query: str, max_results: int = 3) -> str:
         """Busca web com tratamento robusto de erros."""
         try:
@@ -287,14 +705,72 @@ Para usar busca web:
 2. Obtenha uma chave em: https://tavily.com
                 """.strip()
             
+            chave = _chave_busca(query, max_results)
+            if chave in _CACHE_WEB:
+                return _CACHE_WEB[chave]
+            
             tavily_tool = TavilyToolSpec(api_key=tavily_key)
             resultados_raw = tavily_tool.search(query, max_results=max_results)
             
-            return f"🌐 **Busca Web para**: {query}\n\n{str(resultados_raw)}"
+            resposta = f"🌐 **Busca Web para**: {query}\n\n{str(resultados_raw)}"
+            _CACHE_WEB[chave] = resposta
+            return resposta
             
         except Exception as e:
             return f"❌ Erro na busca web: {str(e)}"
 
+    def _load_or_build_index(self, docs_dir: str, persist_dir: str) -> Optional[VectorStoreIndex]:
+        """Carrega o índice salvo em disco ou o reconstrói se os documentos ou o modelo mudaram."""
+        if not os.path.isdir(docs_dir):
+            return None
+
+        try:
+            assinatura = _assinatura_documentos(docs_dir)
+            if not assinatura:
+                return None
+
+            # Vetores de modelos diferentes (e5-large: 1024 dims, MiniLM: 384) não se misturam
+            embed_model = Settings.embed_model
+            modelo = embed_model.nome_resolvido if isinstance(embed_model, _LazyEmbed) else embed_model.model_name
+            chave = {"modelo": modelo, "documentos": assinatura}
+
+            arquivo_chave = os.path.join(persist_dir, "cache_key.json")
+            if os.path.exists(arquivo_chave):
+                with open(arquivo_chave, encoding="utf-8") as f:
+                    if json.load(f) == chave:
+                        index = load_index_from_storage(StorageContext.from_defaults(persist_dir=persist_dir))
+                        logger.info("✅ Índice de documentos carregado do cache")
+                        return index
+            
+            logger.info("🔄 Indexando %d documentos de %s...", len(assinatura), docs_dir)
+            documentos = SimpleDirectoryReader(docs_dir, recursive=True).load_data()
+            index = VectorStoreIndex.from_documents(documentos)
+            index.storage_context.persist(persist_dir=persist_dir)
+            with open(arquivo_chave, "w", encoding="utf-8") as f:
+                json.dump(chave, f)
+
+            logger.info("✅ Índice de documentos criado e salvo (%s)", modelo)
+            return index
+
+        except Exception as e:
+            logger.warning("⚠️ Índice de documentos indisponível: %s", str(e)[:100])
+            return None
+
+    def consulta_documentos(self, pergunta: str) -> str:
+        """Responde com base nos documentos locais indexados."""
+        try:
+            # Índice carregado/construído só na primeira consulta: depende do modelo de embeddings
+            with self._index_lock:
+                if self._index is None:
+                    self._index = self._load_or_build_index(DOCS_DIR, INDEX_DIR)
+            if self._index is None:
+                return f"❌ Não foi possível indexar os documentos de {DOCS_DIR}"
+
+            resposta = self._index.as_query_engine(llm=self.llm_fast).query(pergunta)
+            return f"📁 **Documentos locais**\n\n{str(resposta).strip()}"
+        except Exception as e:
+            return f"❌ Erro na consulta aos documentos: {str(e)}"
+
     def setup_tools(self):
         """Configurar ferramentas do agente."""
         self.tools = [
@@ -307,17 +783,27 @@ Para usar busca web:
                     "Retorna cálculo detalhado com todas as faixas e deduções."
                 )
             ),
+            FunctionTool.from_defaults(
+                fn=self.imposto_renda_lote,
+                name="calcular_imposto_renda_lote",
+                description=(
+                    "🧮 Calcula imposto de renda para vários rendimentos de uma vez (planilhas, carteiras). "
+                    "Parâmetros: rendimentos (str, lista JSON ex: '[50000, 80000]'), ano (int, opcional). "
+                    "Retorna o imposto de cada rendimento e os totais."
+                )
+            ),
             FunctionTool.from_defaults(
                 fn=self.calculadora_financeira_geral,
                 name="calculadora_financeira",
                 description=(
                     "📊 Calculadora financeira geral para diversos cálculos. "
                     "Parâmetros: tipo (str), principal/valor (float), taxa/percentual (float), periodo (int). "
-                    "Tipos: 'porcentagem', 'juros_compostos', 'juros_simples'."
+                    "Tipos: 'porcentagem', 'juros_compostos', 'cronograma_juros' (saldo período a período), 'juros_simples'."
                 )
             ),
             FunctionTool.from_defaults(
-                fn=self.consulta_arxiv_melhorada,
+                fn=self.consulta_arxiv_sync,
+                async_fn=self.consulta_arxiv_melhorada,
                 name="consultar_artigos_cientificos",
                 description=(
                     "📚 Busca artigos científicos no arXiv por relevância. "
@@ -335,6 +821,19 @@ Para usar busca web:
                 )
             )
         ]
+        
+        if self._tem_documentos:
+            self.tools.append(
+                FunctionTool.from_defaults(
+                    fn=self.consulta_documentos,
+                    name="consultar_documentos_locais",
+                    description=(
+                        f"📁 Responde perguntas com base nos documentos da pasta {DOCS_DIR}. "
+                        "Parâmetros: pergunta (str). "
+                        "Retorna a resposta encontrada nos documentos indexados."
+                    )
+                )
+            )
 
     def create_react_agent(self) -> ReActAgent:
         """Criar agente ReAct otimizado."""
@@ -383,61 +882,172 @@ Sempre priorize a precisão e utilidade das informações!
         """.strip()
 
         try:
-            print("🔄 Criando ReActAgent otimizado...")
+            logger.debug("🔄 Criando ReActAgent otimizado...")
             agent = ReActAgent.from_tools(
                 tools=self.tools,
-                llm=self.llm,
-                verbose=True,
+                llm=self.llm_big,
+                verbose=_DEBUG,
                 system_prompt=system_prompt
             )
-            print("✅ ReActAgent criado com sucesso")
+            logger.debug("✅ ReActAgent criado com sucesso")
             return agent
             
         except Exception as e:
-            print(f"⚠️ Erro com from_tools, tentando construtor básico: {e}")
+            logger.warning("⚠️ Erro com from_tools, tentando construtor básico: %s", e)
             try:
                 agent = ReActAgent(
                     tools=self.tools,
-                    llm=self.llm,
-                    verbose=True
+                    llm=self.llm_big,
+                    verbose=_DEBUG
                 )
-                print("✅ ReActAgent criado com construtor básico")
+                logger.debug("✅ ReActAgent criado com construtor básico")
                 return agent
             except Exception as e2:
-                print(f"❌ Erro crítico: {e2}")
+                logger.error("❌ Erro crítico: %s", e2)
                 raise e2
 
     def extrair_valores_numericos(self, texto: str) -> Dict[str, float]:
         """Extrai valores numéricos de texto para cálculos."""
         valores = {}
         
-        # Buscar valores monetários
-        valores_monetarios = re.findall(r'R?\$?\s*([\d.,]+)', texto)
-        if valores_monetarios:
-            valores['principal'] = float(valores_monetarios[0].replace('.', '').replace(',', '.'))
-            valores['valor'] = valores['principal']  # alias para porcentagem
-        
-        # Buscar percentuais
-        percentuais = re.findall(r'([\d.,]+)\s*%', texto)
-        if percentuais:
-            valores['taxa'] = float(percentuais[0].replace(',', '.'))
-            valores['percentual'] = valores['taxa']  # alias para porcentagem
-        
-        # Buscar períodos
-        periodos = re.findall(r'(\d+)\s*(?:anos?|meses?|dias?)', texto, re.IGNORECASE)
-        if periodos:
-            valores['periodo'] = float(periodos[0])
+        for match in _RE_ALL.finditer(texto):
+            tipo = match.lastgroup
+            
+            # Valores monetários
+            if tipo == 'money' and 'principal' not in valores:
+                valores['principal'] = float(match.group('money').translate(_PTBR_TABLE))
+                valores['valor'] = valores['principal']  # alias para porcentagem
+            
+            # Percentuais
+            elif tipo == 'pct' and 'taxa' not in valores:
+                valores['taxa'] = float(match.group('pct').replace(',', '.'))
+                valores['percentual'] = valores['taxa']  # alias para porcentagem
+            
+            # Períodos
+            elif tipo == 'per' and 'periodo' not in valores:
+                valores['periodo'] = float(match.group('per'))
         
         return valores
 
-    def chat(self, message: str) -> str:
-        """Chat inteligente com prioridade para o agente ReAct."""
+    def _buscar_artigos(self, message: str) -> Optional[str]:
+        """Busca no arXiv usando a mensagem sem os termos de comando."""
+        query = _RE_ACADEMIC_STOP.sub('', message).strip()
+        return self.consulta_arxiv_sync(query) if query else None
+
+    def _montar_despacho(self) -> Dict[str, tuple]:
+        """Intenções determinísticas: (campos obrigatórios, condição de confiança, ferramenta chamada direto)."""
+        return {
+            'ir': (
+                ('principal',),
+                _ir_confiavel,
+                lambda msg, v: self.imposto_renda_melhorado(v['principal'])
+            ),
+            'pct': (
+                ('valor', 'percentual'),
+                _pct_confiavel,
+                lambda msg, v: self.calculadora_financeira_geral('porcentagem', **v)
+            ),
+            'jc': (
+                ('principal', 'taxa', 'periodo'),
+                _jc_confiavel,
+                lambda msg, v: self.calculadora_financeira_geral('juros_compostos', **v)
+            ),
+            'arxiv': (
+                (),
+                lambda msg: _RE_COMANDO_BUSCA.search(msg) is not None,
+                lambda msg, v: self._buscar_artigos(msg)
+            ),
+        }
+
+    def _despachar_intencao(self, intencoes: set, message: str) -> Optional[str]:
+        """Executa a ferramenta da intenção direto, sem LLM, quando não há ambiguidade.
+
+        Só há atalho se exatamente uma intenção casou, a condição de confiança
+        dela é satisfeita e a mensagem traz todos os dados obrigatórios.
+        """
+        if len(intencoes) != 1:
+            return None
+
+        (intencao,) = intencoes
+        if intencao not in self._intent_dispatch:
+            return None
+
+        obrigatorios, confiavel, executar = self._intent_dispatch[intencao]
+        if confiavel is not None and not confiavel(message):
+            return None
+
+        # Qualquer falha na extração só desativa o atalho: o ReAct assume a pergunta
         try:
-            print(f"🔍 Processando: '{message}'")
+            valores = self.extrair_valores_numericos(message)
+        except Exception:
+            return None
+        if not all(valores.get(campo) for campo in obrigatorios):
+            return None
+
+        return executar(message, valores)
+
+    def _pedir_confirmacao(self, intencao: Optional[str], message: str) -> Optional[str]:
+        """Mensagem para quando a pergunta traz os dados do cálculo, mas de forma ambígua."""
+        if intencao not in ('ir', 'pct', 'jc'):
+            return None
+
+        try:
+            v = self.extrair_valores_numericos(message)
+        except Exception:
+            return None
+
+        obrigatorios = self._intent_dispatch[intencao][0]
+        if not all(v.get(campo) for campo in obrigatorios):
+            return None
+
+        if intencao == 'ir':
+            return _CONFIRMACAO_TEMPLATE(
+                calculo="imposto de renda",
+                entendido=f"rendimento de R$ {v['principal']:,.2f}",
+                exemplo="Qual o IR de R$ 80.000 anuais?"
+            )
+        if intencao == 'pct':
+            return _CONFIRMACAO_TEMPLATE(
+                calculo="porcentagem",
+                entendido=f"{v['percentual']}% de {v['valor']:,.2f}",
+                exemplo="Quanto é 15% de 10.000?"
+            )
+        return _CONFIRMACAO_TEMPLATE(
+            calculo="juros compostos",
+            entendido=f"capital de R$ {v['principal']:,.2f}, taxa de {v['taxa']}% e {v['periodo']:g} períodos",
+            exemplo="Calcule juros compostos de R$ 10.000 a 1% ao mês por 24 meses"
+        )
+
+    def chat(self, message: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+        """Chat inteligente: atalho direto para intenções óbvias, depois o agente ReAct.
+        
+        Com on_token, respostas geradas diretamente pelo LLM são transmitidas
+        token a token para o callback conforme chegam.
+        """
+        try:
+            if _DEBUG:
+                logger.debug("🔍 Processando: %r", message)
+            
+            # Características da mensagem calculadas uma única vez
+            feats = {
+                'lower': message.lower(),
+                'numeros': _RE_NUMERO.findall(message)
+            }
+            
+            intencoes = detectar_intencoes(feats['lower'])
+            intencao = intencao_prioritaria(intencoes)
+
+            # PRIMEIRA TENTATIVA: intenções determinísticas dispensam o ReAct
+            resposta = self._despachar_intencao(intencoes, message)
+            if resposta is not None:
+                if _DEBUG:
+                    logger.debug("⚡ Intenção %r resolvida diretamente", intencao)
+                return resposta
             
-            # PRIMEIRA TENTATIVA: Sempre usar o agente ReAct
+            # SEGUNDA TENTATIVA: agente ReAct
             try:
-                print("🤖 Tentando agente ReAct...")
+                if _DEBUG:
+                    logger.debug("🤖 Tentando agente ReAct...")
                 
                 if hasattr(self.agent, 'query'):
                     response = self.agent.query(message)
@@ -450,36 +1060,36 @@ Sempre priorize a precisão e utilidade das informações!
                 
                 # Verificar se a resposta é útil
                 if result and len(result) > 20 and not any(erro in result.lower() for erro in ['error', 'erro', 'failed', 'none']):
-                    print("✅ ReAct respondeu com sucesso")
+                    if _DEBUG:
+                        logger.debug("✅ ReAct respondeu com sucesso")
                     return result
                 else:
-                    print("⚠️ Resposta do ReAct inadequada, tentando fallback")
+                    if _DEBUG:
+                        logger.debug("⚠️ Resposta do ReAct inadequada, tentando fallback")
                     
             except Exception as e:
-                print(f"⚠️ ReAct falhou: {str(e)[:100]}")
+                logger.warning("⚠️ ReAct falhou: %s", str(e)[:100])
             
             # FALLBACK: Análise manual e uso de ferramentas específicas
-            print("🔄 Usando análise manual...")
+            if _DEBUG:
+                logger.debug("🔄 Usando análise manual...")
             
-            message_lower = message.lower()
+            # Valores informados, mas o atalho foi descartado por ambiguidade
+            confirmacao = self._pedir_confirmacao(intencao, message)
+            if confirmacao is not None:
+                return confirmacao
             
             # Detecção específica para IR
-            if any(term in message_lower for term in ['imposto de renda', 'calcular ir', 'ir de']):
-                print("💰 Detectado: Imposto de Renda")
-                valores = self.extrair_valores_numericos(message)
-                if valores.get('principal'):
-                    return self.imposto_renda_melhorado(valores['principal'])
-                else:
-                    return "❌ Por favor, informe o valor da renda para calcular o IR"
+            if intencao == 'ir':
+                if _DEBUG:
+                    logger.debug("💰 Detectado: Imposto de Renda sem valor")
+                return "❌ Por favor, informe o valor da renda para calcular o IR"
             
             # Detecção para cálculos de porcentagem
-            elif any(term in message_lower for term in ['% de', 'porcent', 'percentual de']):
-                print("📊 Detectado: Cálculo de Porcentagem")
-                valores = self.extrair_valores_numericos(message)
-                if valores.get('valor') and valores.get('percentual'):
-                    return self.calculadora_financeira_geral('porcentagem', **valores)
-                else:
-                    return """
+            elif intencao == 'pct':
+                if _DEBUG:
+                    logger.debug("📊 Detectado: Porcentagem com dados incompletos")
+                return """
 📊 **Para calcular porcentagem, preciso de:**
 💰 Valor base (ex: 10.000)
 📈 Percentual (ex: 15%)
@@ -488,38 +1098,35 @@ Sempre priorize a precisão e utilidade das informações!
 • "Quanto é 15% de 10.000?"
 • "Calcule 20% de R$ 5.000"
 • "Qual é 8,5% de 12.500?"
-                    """.strip()
+                """.strip()
             
             # Detecção para juros compostos
-            elif any(term in message_lower for term in ['juros compostos', 'compound interest', 'montante']):
-                print("📈 Detectado: Juros Compostos")
-                valores = self.extrair_valores_numericos(message)
-                if all(k in valores for k in ['principal', 'taxa', 'periodo']):
-                    return self.calculadora_financeira_geral('juros_compostos', **valores)
-                else:
-                    return """
+            elif intencao == 'jc':
+                if _DEBUG:
+                    logger.debug("📈 Detectado: Juros Compostos com dados incompletos")
+                return """
 📈 **Para calcular juros compostos, preciso de:**
 💰 Capital inicial (ex: R$ 10.000)
 📊 Taxa de juros (ex: 10% ao ano)
 ⏱️ Período (ex: 5 anos)
 
 **Exemplo:** "Calcule juros compostos de R$ 10.000 a 10% por 5 anos"
-                    """.strip()
+                """.strip()
             
             # Detecção para artigos científicos
-            elif any(term in message_lower for term in ['artigos científicos', 'papers', 'arxiv', 'pesquisa acadêmica']):
-                print("📚 Detectado: Busca Acadêmica")
+            elif intencao == 'arxiv':
+                if _DEBUG:
+                    logger.debug("📚 Detectado: Busca Acadêmica")
                 # Limpar termos da busca
-                query = re.sub(r'\b(busque|procure|artigos|científicos|papers|sobre)\b', '', message, flags=re.IGNORECASE).strip()
-                return self.consulta_arxiv_melhorada(query)
+                query = _RE_ACADEMIC_STOP.sub('', message).strip()
+                return self.consulta_arxiv_sync(query)
             
             # Para perguntas incompletas sobre porcentagem
-            elif 'porcentagem' in message_lower and any(num in message for num in re.findall(r'\d+', message)):
-                print("❓ Detectado: Pergunta incompleta sobre porcentagem")
-                numeros = re.findall(r'[\d.,]+', message)
-                if numeros:
-                    valor = numeros[0].replace('.', '').replace(',', '.')
-                    return f"""
+            elif 'porcentagem' in feats['lower'] and feats['numeros']:
+                if _DEBUG:
+                    logger.debug("❓ Detectado: Pergunta incompleta sobre porcentagem")
+                valor = feats['numeros'][0].translate(_PTBR_TABLE)
+                return f"""
 ❓ **Pergunta incompleta detectada!**
 
 Você mencionou o valor **{valor}**, mas não especificou:
@@ -532,23 +1139,33 @@ Você mencionou o valor **{valor}**, mas não especificou:
 
 💡 **Ou talvez queira saber:**
 • "{valor} é quantos % de [outro valor]?"
-                    """.strip()
+                """.strip()
             
             # Resposta para perguntas gerais usando conhecimento do LLM
             else:
-                print("🧠 Respondendo com conhecimento geral")
+                if _DEBUG:
+                    logger.debug("🧠 Respondendo com conhecimento geral")
                 
-                # Usar o LLM diretamente para perguntas gerais
-                try:
-                    response = self.llm.complete(f"""
+                # Usar o LLM rápido diretamente para perguntas gerais
+                prompt = f"""
 Você é um assistente IA especializado. Responda à pergunta de forma clara e didática:
 
 PERGUNTA: {message}
 
 Forneça uma resposta detalhada e bem formatada com emojis quando apropriado.
-                    """)
+                """
+                try:
+                    with _usar_llm(self.llm_fast) as llm:
+                        if on_token is None:
+                            return str(llm.complete(prompt)).strip()
+                        
+                        partes = []
+                        for parcial in llm.stream_complete(prompt):
+                            delta = parcial.delta or ""
+                            on_token(delta)
+                            partes.append(delta)
                     
-                    return str(response).strip()
+                    return "".join(partes).strip()
                     
                 except Exception as e:
                     return f"""
@@ -565,9 +1182,7 @@ Forneça uma resposta detalhada e bem formatada com emojis quando apropriado.
                     """.strip()
                 
         except Exception as e:
-            print(f"❌ Erro crítico no chat: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("❌ Erro crítico no chat: %s", e)
             return f"❌ Erro crítico: {str(e)}"
 
 def main():
@@ -637,14 +1252,26 @@ if __name__ == "__main__":
                     print("⚠️ Por favor, digite uma pergunta.")
                     continue
                 
-                print(f"\n🤖 **Processando sua pergunta...**")
-                print("-" * 40)
+                transmitido = []
                 
-                response = agent.chat(user_input)
+                def imprimir_token(token: str) -> None:
+                    if not transmitido:
+                        print("\n📋 **Resposta:**")
+                        print("=" * 50)
+                    transmitido.append(token)
+                    print(token, end="", flush=True)
                 
-                print(f"\n📋 **Resposta:**")
-                print("=" * 50)
-                print(response)
+                response = agent.chat(user_input, on_token=imprimir_token)
+                
+                if transmitido:
+                    print()
+                    # Erro no meio da transmissão: a mensagem de erro não foi exibida
+                    if response != "".join(transmitido).strip():
+                        print(response)
+                else:
+                    print("\n📋 **Resposta:**")
+                    print("=" * 50)
+                    print(response)
                 print("=" * 50)
                 
             except KeyboardInterrupt:
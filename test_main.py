@@ -0,0 +1,72 @@
+"""Testes do atalho de intenções determinísticas (sem chamadas ao LLM)."""
+
+import pytest
+
+main = pytest.importorskip("main")
+
+
+@pytest.fixture
+def agente():
+    # Sem __init__: nada de chaves de API, LLMs ou carregamento de embeddings
+    agente = main.ImprovedFinancialAgent.__new__(main.ImprovedFinancialAgent)
+    agente._intent_dispatch = agente._montar_despacho()
+    return agente
+
+
+def despachar(agente, mensagem):
+    return agente._despachar_intencao(main.detectar_intencoes(mensagem.lower()), mensagem)
+
+
+@pytest.mark.parametrize("mensagem", [
+    # Multiplicadores: o extrator leria 80 / 10
+    "Qual o IR de 80 mil reais?",
+    "Calcule juros compostos de R$ 10 mil a 2% por 3 anos",
+    "Quanto é 10% de 5k?",
+    # Taxa mensal com período em anos
+    "juros compostos de R$ 1.000 a 1% ao mês por 2 anos",
+    # Juros simples e aportes não são cobertos pelo atalho de juros compostos
+    "Qual o montante a juros simples de R$ 1.000 a 1% por 12 meses?",
+    "Montante com aporte de R$ 100 a 1% por 12 meses",
+    # Valores mensais ou de outro ano não usam a tabela anual de 2024
+    "IR de um salário de R$ 5.000",
+    "imposto de renda ganhando R$ 5.000 por mês",
+    "imposto de renda 2023 de R$ 80.000",
+    # Mais de uma intenção
+    "Calcule juros compostos de R$ 1.000 a 2% de juros ao mês por 12 meses",
+    # arXiv sem pedido explícito de busca
+    "O que são white papers de criptomoedas?",
+    "O que é o arXiv?",
+])
+def test_mensagens_ambiguas_vao_para_o_react(agente, mensagem):
+    assert despachar(agente, mensagem) is None
+
+
+@pytest.mark.parametrize("mensagem, esperado", [
+    ("Qual o imposto de renda para R$ 80.000 anuais?", "R$ 80,000.00"),
+    ("Olá, qual o imposto de renda para R$ 80.000 anuais?", "R$ 80,000.00"),
+    ("calcular ir, rendimento R$ 50.000", "R$ 50,000.00"),
+    ("Quanto é 15% de 10.000?", "1,500.00"),
+    ("Calcule juros compostos de R$ 10.000 a 10% por 5 anos", "16,105.10"),
+    ("juros compostos de R$ 1.000 a 1% ao mês por 24 meses", "1,269.73"),
+])
+def test_mensagens_claras_sao_calculadas_direto(agente, mensagem, esperado):
+    resposta = despachar(agente, mensagem)
+    assert resposta is not None
+    assert esperado in resposta
+
+
+class _AgenteQueFalha:
+    def query(self, mensagem):
+        raise RuntimeError("ReAct indisponível")
+
+
+@pytest.mark.parametrize("mensagem, calculo", [
+    ("imposto de renda ganhando R$ 5.000 por mês", "imposto de renda"),
+    ("Calcule juros compostos de R$ 1.000 a 2% de juros ao mês por 12 meses", "porcentagem"),
+    ("juros compostos de R$ 1.000 a 1% ao mês por 2 anos", "juros compostos"),
+])
+def test_fallback_com_valores_pede_confirmacao(agente, mensagem, calculo):
+    agente.agent = _AgenteQueFalha()
+    resposta = agente.chat(mensagem)
+    assert f"confirmar o cálculo de {calculo}" in resposta
+    assert "informe o valor" not in resposta